@@ -88,6 +88,7 @@ else
 fi
 
 echo "✅ FETCH_PERIOD_DAYS: ${FETCH_PERIOD_DAYS:-7} (デフォルト値使用)"
+echo "✅ COMPRESS_ARCHIVE: ${COMPRESS_ARCHIVE:-false}"
 
 echo ""
 
@@ -143,12 +144,15 @@ if [ "$ENV_MISSING" = true ]; then
     read -p "FEEDLY_STREAM_ID: " STREAM_ID
     read -p "FETCH_PERIOD_DAYS (デフォルト: 7): " FETCH_DAYS
     FETCH_DAYS=${FETCH_DAYS:-7}
+    read -p "COMPRESS_ARCHIVE (デフォルト: false): " COMPRESS
+    COMPRESS=${COMPRESS:-false}
 else
     echo "設定済みの環境変数を使用してデプロイします..."
     FEEDLY_TOKEN="$FEEDLY_ACCESS_TOKEN"
     DRIVE_FOLDER_ID="$GOOGLE_DRIVE_FOLDER_ID"
     STREAM_ID="$FEEDLY_STREAM_ID"
     FETCH_DAYS="${FETCH_PERIOD_DAYS:-7}"
+    COMPRESS="${COMPRESS_ARCHIVE:-false}"
 fi
 
 echo ""
@@ -156,7 +160,7 @@ echo "🚀 Cloud Functionをデプロイ中..."
 
 # 実際のデプロイを実行
 $DEPLOY_CMD \
-    --set-env-vars FEEDLY_ACCESS_TOKEN="$FEEDLY_TOKEN",GOOGLE_DRIVE_FOLDER_ID="$DRIVE_FOLDER_ID",FEEDLY_STREAM_ID="$STREAM_ID",FETCH_PERIOD_DAYS="$FETCH_DAYS",GCP_PROJECT_ID="$PROJECT_ID"
+    --set-env-vars FEEDLY_ACCESS_TOKEN="$FEEDLY_TOKEN",GOOGLE_DRIVE_FOLDER_ID="$DRIVE_FOLDER_ID",FEEDLY_STREAM_ID="$STREAM_ID",FETCH_PERIOD_DAYS="$FETCH_DAYS",COMPRESS_ARCHIVE="$COMPRESS",GCP_PROJECT_ID="$PROJECT_ID"
 
 if [ $? -eq 0 ]; then
     echo ""
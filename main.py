@@ -10,76 +10,147 @@ Environment Variables Required:
 - GOOGLE_DRIVE_FOLDER_ID: Google Drive folder ID for uploads
 - FETCH_PERIOD_DAYS: Number of days to look back for articles (default: 7)
 - GCP_PROJECT_ID: Google Cloud Project ID (for Cloud Function deployment)
+- COMPRESS_ARCHIVE: Upload the batch file gzip-compressed as .txt.gz (default: false)
 
 Local Testing Additional Variables:
 - GOOGLE_SERVICE_ACCOUNT_FILE: Path to service account JSON file (local only)
 """
 
 import os
-import json
 import csv
+import functools
+import gzip
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 import requests
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from io import BytesIO, StringIO
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Dict, Iterator, List, Optional, Tuple
+from io import BytesIO, TextIOWrapper
 import google.auth
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from googleapiclient.http import MediaInMemoryUpload
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+FEEDLY_STREAM_CONTENTS_URL = "https://cloud.feedly.com/v3/streams/contents"
 
-def fetch_feedly_articles(api_token: str, stream_id: str, newer_than_timestamp_ms: int) -> List[Dict]:
-    base_url = "https://cloud.feedly.com/v3/streams/contents"
+# Number of items requested per Feedly streams/contents page
+FEEDLY_PAGE_SIZE = 100
+
+# Payloads above this size are sent as resumable (chunked) uploads
+RESUMABLE_UPLOAD_THRESHOLD_BYTES = 5 * 1024 * 1024
+
+# Column order of the archived CSV file
+CSV_FIELDNAMES = ("starCount", "title", "publishedDate", "url")
+
+
+def _read_fetch_period_days() -> int:
+    try:
+        return int(os.environ.get("FETCH_PERIOD_DAYS", "7"))
+    except ValueError:
+        logger.warning("FETCH_PERIOD_DAYS is not a valid integer, using default value of 7")
+        return 7
+
+
+# Environment is fixed for the lifetime of a Cloud Function instance, so read it once at cold start
+FEEDLY_ACCESS_TOKEN = os.environ.get("FEEDLY_ACCESS_TOKEN")
+FEEDLY_STREAM_ID = os.environ.get("FEEDLY_STREAM_ID")
+GOOGLE_DRIVE_FOLDER_ID = os.environ.get("GOOGLE_DRIVE_FOLDER_ID")
+FETCH_PERIOD_DAYS = _read_fetch_period_days()
+COMPRESS_ARCHIVE = os.environ.get("COMPRESS_ARCHIVE", "false").lower() == "true"
+
+# (connect, read) timeout in seconds for Feedly API requests
+FEEDLY_REQUEST_TIMEOUT = (5, 30)
+
+
+def _create_session() -> requests.Session:
+    session = requests.Session()
+    retry = Retry(total=5, backoff_factor=1.0, status_forcelist=(429, 500, 502, 503, 504),
+                  respect_retry_after_header=True, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Keep-alive connections to Feedly are reused across pages and warm invocations
+_SESSION = _create_session()
+
+
+@dataclass(slots=True)
+class Article:
+    """One archived Feedly article, i.e. one CSV row"""
+    title: str
+    url: str
+    star_count: int
+    published_date: str
+
+
+def _fetch_feedly_page(headers: Dict, params: Dict) -> Optional[Dict]:
+    response = _SESSION.get(FEEDLY_STREAM_CONTENTS_URL, headers=headers, params=params, timeout=FEEDLY_REQUEST_TIMEOUT)
+    
+    if response.status_code != 200:
+        logger.error("Feedly API request failed with status %d", response.status_code)
+        # Guarded so the body is only decoded when debug logging is actually enabled
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Feedly API response body: %s", response.text)
+        return None
+    
+    try:
+        return orjson.loads(response.content)
+    except orjson.JSONDecodeError as e:
+        logger.error("Feedly API returned invalid JSON: %s", e)
+        return None
+
+
+def compute_newer_than_timestamp_ms(fetch_period_days: int) -> int:
+    """Return the Feedly newerThan cutoff for the last fetch_period_days days"""
+    return int((time.time() - fetch_period_days * 86400) * 1000)
+
+
+def iter_feedly_articles(api_token: str, stream_id: str, newer_than_timestamp_ms: int) -> Iterator[Article]:
+    """Fetch Feedly articles page by page and yield them as Article rows"""
     headers = {"Authorization": f"Bearer {api_token}", "Content-Type": "application/json"}
-    all_articles = []
-    continuation = None
     
     try:
-        while True:
-            params = {"streamId": stream_id, "count": 100, "newerThan": newer_than_timestamp_ms}
-            if continuation:
-                params["continuation"] = continuation
-            
-            response = requests.get(base_url, headers=headers, params=params)
-            
-            if response.status_code != 200:
-                logger.error(f"Feedly API request failed with status {response.status_code}")
-                break
-            
-            data = response.json()
-            items = data.get("items", [])
-            if not items:
-                break
-            
-            for item in items:
-                alternate_links = item.get("alternate", [])
-                url = ""
-                for link in alternate_links:
-                    if link.get("type") == "text/html":
-                        url = link.get("href", "")
-                        break
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            base_params = {"streamId": stream_id, "count": FEEDLY_PAGE_SIZE, "newerThan": newer_than_timestamp_ms}
+            pending_page = executor.submit(_fetch_feedly_page, headers, base_params)
+            while pending_page is not None:
+                data = pending_page.result()
+                if not data:
+                    break
                 
-                all_articles.append({
-                    "id": item.get("id", ""),
-                    "title": item.get("title", ""),
-                    "published": item.get("published", 0),
-                    "engagement": item.get("engagement", 0),
-                    "alternate": url
-                })
-            
-            continuation = data.get("continuation")
-            if not continuation:
-                break
-        
-        return all_articles
+                items = data.get("items", [])
+                if not items:
+                    break
+                
+                continuation = data.get("continuation")
+                if continuation:
+                    # Fetch the next page in the background while this one is converted and consumed
+                    pending_page = executor.submit(
+                        _fetch_feedly_page, headers, {**base_params, "continuation": continuation})
+                else:
+                    pending_page = None
+                
+                for item in items:
+                    yield Article(
+                        title=clean_title(item.get("title", "")),
+                        url=next((link["href"] for link in item.get("alternate", ())
+                                  if link.get("type") == "text/html" and "href" in link), ""),
+                        star_count=item.get("engagement", 0),
+                        published_date=_format_published(item.get("published", 0))
+                    )
         
     except Exception as e:
-        logger.error(f"Error while fetching from Feedly API: {e}")
-        return []
+        logger.error("Error while fetching from Feedly API: %s", e)
 
 
 def clean_title(title: str) -> str:
@@ -93,91 +164,127 @@ def clean_title(title: str) -> str:
         cleaned = ' '.join(cleaned.split())
         return cleaned
     except Exception as e:
-        logger.error(f"Error cleaning title: {e}")
+        logger.error("Error cleaning title: %s", e)
         return ""
 
 
-def transform_to_csv_structure(article_data: Dict) -> Dict:
-    try:
-        published_timestamp = article_data.get("published", 0)
-        published_date = datetime.utcfromtimestamp(published_timestamp / 1000).isoformat() + 'Z' if published_timestamp else ""
-        
-        return {
-            "title": clean_title(article_data.get("title", "")),
-            "url": article_data.get("alternate", ""),
-            "starCount": article_data.get("engagement", 0),
-            "publishedDate": published_date
-        }
-    except Exception as e:
-        logger.error(f"Error transforming article data: {e}")
-        return {"title": "", "url": "", "starCount": 0, "publishedDate": ""}
+@functools.lru_cache(maxsize=64)
+def _utc_date_prefix(epoch_day: int) -> str:
+    """Return the 'YYYY-MM-DDT' prefix for a day number since the Unix epoch"""
+    tm = time.gmtime(epoch_day * 86400)
+    return f"{tm.tm_year:04d}-{tm.tm_mon:02d}-{tm.tm_mday:02d}T"
 
 
-def generate_csv_content(articles: List[Dict]) -> str:
-    """Generate CSV content from articles list"""
+def _format_published(published_timestamp_ms: int) -> str:
+    """Format a Feedly millisecond timestamp as an ISO 8601 UTC string"""
+    if not published_timestamp_ms:
+        return ""
+    # Articles in a fetch window share a handful of dates, so only the time of day is computed per article
+    epoch_day, ms_of_day = divmod(int(published_timestamp_ms), 86_400_000)
+    minutes, seconds = divmod(ms_of_day // 1000, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{_utc_date_prefix(epoch_day)}{hours:02d}:{minutes:02d}:{seconds:02d}Z"
+
+
+def generate_csv_content(articles: List[Article]) -> bytes:
+    """Generate UTF-8 encoded CSV content from articles list"""
     try:
-        output = StringIO()
-        fieldnames = ["starCount", "title", "publishedDate", "url"]
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
+        buffer = BytesIO()
+        # Encode rows straight into the byte buffer so no intermediate str copy is built
+        output = TextIOWrapper(buffer, encoding='utf-8', newline='')
+        writer = csv.writer(output)
         
         # Sort articles by starCount in descending order (high to low)
-        sorted_articles = sorted(articles, key=lambda x: x.get('starCount', 0), reverse=True)
+        sorted_articles = sorted(articles, key=attrgetter('star_count'), reverse=True)
         
         # Write header
-        writer.writeheader()
+        writer.writerow(CSV_FIELDNAMES)
         
         # Write sorted articles
-        for article in sorted_articles:
-            writer.writerow(article)
+        writer.writerows(
+            (article.star_count, article.title, article.published_date, article.url)
+            for article in sorted_articles
+        )
         
-        csv_content = output.getvalue()
-        output.close()
-        return csv_content
+        output.flush()
+        output.detach()
+        return buffer.getvalue()
     except Exception as e:
-        logger.error(f"Error generating CSV content: {e}")
-        return ""
+        logger.error("Error generating CSV content: %s", e)
+        return b""
 
 
 def generate_batch_filename() -> str:
     """Generate filename for batch of articles"""
-    try:
-        current_time = datetime.now()
-        return f"feedly_articles_{current_time.strftime('%Y%m%d_%H%M%S')}.txt"
-    except Exception as e:
-        logger.error(f"Error generating filename: {e}")
-        return f"feedly_articles_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+    return f"feedly_articles_{time.strftime('%Y%m%d_%H%M%S')}.txt"
+
+
+def compress_batch(file_name: str, csv_data: bytes) -> Tuple[str, bytes]:
+    """Gzip the batch CSV content and append .gz to its filename"""
+    return f"{file_name}.gz", gzip.compress(csv_data, compresslevel=6)
+
 
+def build_batch_file(articles: List[Article], compress: bool) -> Tuple[str, bytes, str]:
+    """Render articles into the batch file's (filename, content, mimetype)"""
+    filename = generate_batch_filename()
+    csv_data = generate_csv_content(articles)
+    if compress:
+        filename, csv_data = compress_batch(filename, csv_data)
+        return filename, csv_data, 'application/gzip'
+    return filename, csv_data, 'text/plain'
 
-def upload_to_google_drive_adc(folder_id: str, file_name: str, csv_data_string: str) -> Optional[str]:
+
+def _build_media_body(csv_data: bytes, mimetype: str) -> MediaInMemoryUpload:
+    """Use a single multipart POST for small payloads, resumable upload only for large ones"""
+    resumable = len(csv_data) > RESUMABLE_UPLOAD_THRESHOLD_BYTES
+    return MediaInMemoryUpload(csv_data, mimetype=mimetype, resumable=resumable)
+
+
+# The httplib2-backed clients below are not thread-safe. Sharing them is fine because each
+# Cloud Functions (gen2) instance serves one request at a time (default concurrency of 1).
+@functools.lru_cache(maxsize=1)
+def _get_drive_service():
+    """Return the ADC-backed Drive client, building it once per container"""
+    credentials, project = google.auth.default(scopes=['https://www.googleapis.com/auth/drive.file'])
+    # static_discovery uses the discovery document bundled with the library (no HTTP fetch)
+    return build('drive', 'v3', credentials=credentials, cache_discovery=False, static_discovery=True)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_service_account_drive_service(service_account_file_path: str):
+    """Return the service-account-backed Drive client, loading the key once per key file"""
+    credentials = service_account.Credentials.from_service_account_file(
+        service_account_file_path, scopes=['https://www.googleapis.com/auth/drive.file'])
+    return build('drive', 'v3', credentials=credentials, cache_discovery=False, static_discovery=True)
+
+
+def upload_to_google_drive_adc(folder_id: str, file_name: str, csv_data: bytes, mimetype: str = 'text/plain') -> Optional[str]:
     try:
-        credentials, project = google.auth.default(scopes=['https://www.googleapis.com/auth/drive.file'])
-        service = build('drive', 'v3', credentials=credentials)
+        service = _get_drive_service()
         
         file_metadata = {'name': file_name, 'parents': [folder_id]}
-        media_body = MediaIoBaseUpload(BytesIO(csv_data_string.encode('utf-8')), mimetype='text/plain', resumable=True)
+        media_body = _build_media_body(csv_data, mimetype)
         
         file_result = service.files().create(body=file_metadata, media_body=media_body, fields='id').execute()
         return file_result.get('id')
         
     except Exception as e:
-        logger.error(f"Error uploading to Google Drive using ADC: {e}")
+        logger.error("Error uploading to Google Drive using ADC: %s", e)
         return None
 
 
-def upload_to_google_drive(service_account_file_path: str, folder_id: str, file_name: str, csv_data_string: str) -> Optional[str]:
+def upload_to_google_drive(service_account_file_path: str, folder_id: str, file_name: str, csv_data: bytes, mimetype: str = 'text/plain') -> Optional[str]:
     try:
-        credentials = service_account.Credentials.from_service_account_file(
-            service_account_file_path, scopes=['https://www.googleapis.com/auth/drive.file'])
-        service = build('drive', 'v3', credentials=credentials)
+        service = _get_service_account_drive_service(service_account_file_path)
         
         file_metadata = {'name': file_name, 'parents': [folder_id]}
-        media_body = MediaIoBaseUpload(BytesIO(csv_data_string.encode('utf-8')), mimetype='text/plain', resumable=True)
+        media_body = _build_media_body(csv_data, mimetype)
         
         file_result = service.files().create(body=file_metadata, media_body=media_body, fields='id').execute()
         return file_result.get('id')
         
     except Exception as e:
-        logger.error(f"Error uploading to Google Drive: {e}")
+        logger.error("Error uploading to Google Drive: %s", e)
         return None
 
 
@@ -185,15 +292,10 @@ def main(request):
     try:
         logger.info("Feedly archiver function started")
         
-        feedly_token = os.environ.get("FEEDLY_ACCESS_TOKEN")
-        stream_id = os.environ.get("FEEDLY_STREAM_ID") 
-        google_drive_folder_id = os.environ.get("GOOGLE_DRIVE_FOLDER_ID")
-        
-        try:
-            fetch_period_days = int(os.environ.get("FETCH_PERIOD_DAYS", "7"))
-        except ValueError:
-            logger.warning("FETCH_PERIOD_DAYS is not a valid integer, using default value of 7")
-            fetch_period_days = 7
+        feedly_token = FEEDLY_ACCESS_TOKEN
+        stream_id = FEEDLY_STREAM_ID
+        google_drive_folder_id = GOOGLE_DRIVE_FOLDER_ID
+        fetch_period_days = FETCH_PERIOD_DAYS
         
         if not feedly_token:
             logger.error("FEEDLY_ACCESS_TOKEN environment variable is missing")
@@ -206,49 +308,33 @@ def main(request):
             return {"error": "GOOGLE_DRIVE_FOLDER_ID environment variable is missing"}, 400
         
         # Log configuration
-        logger.info(f"Configuration: Stream ID: {stream_id[:20]}..., Folder ID: {google_drive_folder_id}, Period: {fetch_period_days} days")
+        logger.info("Configuration: Stream ID: %s..., Folder ID: %s, Period: %d days", stream_id[:20], google_drive_folder_id, fetch_period_days)
         
-        older_than_date = datetime.now() - timedelta(days=fetch_period_days)
-        newer_than_timestamp_ms = int(older_than_date.timestamp() * 1000)
-        logger.info(f"Fetching articles newer than: {older_than_date.isoformat()} (timestamp: {newer_than_timestamp_ms})")
+        newer_than_timestamp_ms = compute_newer_than_timestamp_ms(fetch_period_days)
+        logger.info("Fetching articles from the last %d days (timestamp: %d)", fetch_period_days, newer_than_timestamp_ms)
         
         logger.info("Starting article fetch from Feedly API")
-        articles = fetch_feedly_articles(feedly_token, stream_id, newer_than_timestamp_ms)
+        transformed_articles = list(iter_feedly_articles(feedly_token, stream_id, newer_than_timestamp_ms))
         
-        if not articles:
+        if not transformed_articles:
             logger.info("No articles were fetched from Feedly")
             return {"message": "No articles were fetched from Feedly", "articles_processed": 0}, 200
         
-        logger.info(f"Successfully fetched {len(articles)} articles from Feedly")
-        
-        # Transform all articles to CSV structure
-        transformed_articles = []
-        for article in articles:
-            try:
-                transformed_article = transform_to_csv_structure(article)
-                transformed_articles.append(transformed_article)
-            except Exception as e:
-                logger.error(f"Error transforming article {article.get('id', 'unknown')}: {e}")
-        
-        if not transformed_articles:
-            logger.warning("No articles were successfully transformed")
-            return {"message": "No articles were successfully transformed", "articles_processed": 0}, 200
+        logger.info("Successfully fetched %d articles from Feedly", len(transformed_articles))
         
-        # Create CSV data
-        filename = generate_batch_filename()
-        csv_data = generate_csv_content(transformed_articles)
+        filename, csv_data, mimetype = build_batch_file(transformed_articles, COMPRESS_ARCHIVE)
         
-        logger.info(f"Starting upload of batch file: {filename}")
+        logger.info("Starting upload of batch file: %s", filename)
         
-        file_id = upload_to_google_drive_adc(google_drive_folder_id, filename, csv_data)
+        file_id = upload_to_google_drive_adc(google_drive_folder_id, filename, csv_data, mimetype)
         
         if file_id:
             success_message = f"Feedly archiver function completed: Batch file uploaded successfully with {len(transformed_articles)} articles"
-            logger.info(f"Successfully uploaded batch file: {filename} (ID: {file_id})")
+            logger.info("Successfully uploaded batch file: %s (ID: %s)", filename, file_id)
             
             return {
                 "message": success_message,
-                "articles_fetched": len(articles),
+                "articles_fetched": len(transformed_articles),
                 "articles_processed": len(transformed_articles),
                 "batch_file": {
                     "filename": filename,
@@ -262,7 +348,7 @@ def main(request):
             return {"error": error_message}, 500
         
     except Exception as e:
-        logger.error(f"Unexpected error in main function: {e}")
+        logger.error("Unexpected error in main function: %s", e)
         return {"error": f"Unexpected error in main function: {e}"}, 500
 
 
@@ -276,40 +362,28 @@ if __name__ == "__main__":
     fetch_period_days = int(os.getenv("FETCH_PERIOD_DAYS", 7))
     google_drive_folder_id = os.getenv("GOOGLE_DRIVE_FOLDER_ID")
     service_account_file = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE")
+    compress_archive = os.getenv("COMPRESS_ARCHIVE", "false").lower() == "true"
     
     if not feedly_token or not stream_id:
         logger.error("Required environment variables are missing. Please check your .env file.")
         exit(1)
     
-    older_than_date = datetime.now() - timedelta(days=fetch_period_days)
-    newer_than_timestamp_ms = int(older_than_date.timestamp() * 1000)
+    newer_than_timestamp_ms = compute_newer_than_timestamp_ms(fetch_period_days)
     
-    articles = fetch_feedly_articles(feedly_token, stream_id, newer_than_timestamp_ms)
+    transformed_articles = list(iter_feedly_articles(feedly_token, stream_id, newer_than_timestamp_ms))
     
-    if articles:
-        # Transform all articles to CSV structure
-        transformed_articles = []
-        for article in articles:
-            try:
-                transformed_article = transform_to_csv_structure(article)
-                transformed_articles.append(transformed_article)
-            except Exception as e:
-                logger.error(f"Error transforming article {article.get('id', 'unknown')}: {e}")
+    if transformed_articles:
+        filename, csv_data, mimetype = build_batch_file(transformed_articles, compress_archive)
         
-        if transformed_articles:
-            # Create CSV data
-            filename = generate_batch_filename()
-            csv_data = generate_csv_content(transformed_articles)
-            
-            if google_drive_folder_id and service_account_file:
-                file_id = upload_to_google_drive(service_account_file, google_drive_folder_id, filename, csv_data)
-                if file_id:
-                    logger.info(f"Successfully uploaded batch file: {filename} (ID: {file_id}) with {len(transformed_articles)} articles")
-                else:
-                    logger.error(f"Failed to upload batch file: {filename}")
+        if google_drive_folder_id and service_account_file:
+            file_id = upload_to_google_drive(service_account_file, google_drive_folder_id, filename, csv_data, mimetype)
+            if file_id:
+                logger.info("Successfully uploaded batch file: %s (ID: %s) with %d articles", filename, file_id, len(transformed_articles))
             else:
-                logger.info(f"Would upload batch file: {filename} with {len(transformed_articles)} articles")
+                logger.error("Failed to upload batch file: %s", filename)
+        else:
+            logger.info("Would upload batch file: %s with %d articles", filename, len(transformed_articles))
         
-        logger.info(f"Processed: {len(articles)} articles fetched, {len(transformed_articles)} articles transformed")
+        logger.info("Processed: %d articles fetched and transformed", len(transformed_articles))
     else:
         logger.warning("No articles were fetched.")
@@ -4,6 +4,7 @@ Feedly API test script to check user profile and valid stream IDs
 """
 
 import os
+import orjson
 import requests
 from dotenv import load_dotenv
 
@@ -23,7 +24,7 @@ def test_user_profile():
         response = requests.get(url, headers=headers)
         print(f"Profile API Status: {response.status_code}")
         if response.status_code == 200:
-            profile_data = response.json()
+            profile_data = orjson.loads(response.content)
             print("User Profile:")
             print(f"  ID: {profile_data.get('id')}")
             print(f"  Email: {profile_data.get('email')}")
@@ -44,7 +45,7 @@ def test_subscriptions():
         response = requests.get(url, headers=headers)
         print(f"\nSubscriptions API Status: {response.status_code}")
         if response.status_code == 200:
-            subscriptions = response.json()
+            subscriptions = orjson.loads(response.content)
             print(f"Number of subscriptions: {len(subscriptions)}")
             if subscriptions:
                 print("First few subscriptions:")
@@ -66,7 +67,7 @@ def test_categories():
         response = requests.get(url, headers=headers)
         print(f"\nCategories API Status: {response.status_code}")
         if response.status_code == 200:
-            categories = response.json()
+            categories = orjson.loads(response.content)
             print(f"Number of categories: {len(categories)}")
             if categories:
                 print("Categories:")
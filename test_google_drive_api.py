@@ -6,22 +6,31 @@ This script tests the Google Drive upload functionality with a sample JSON file.
 """
 
 import os
-import json
+import orjson
 import logging
-from datetime import datetime
+import stat
+import time
+from datetime import datetime, timezone
+from typing import Final
 from dotenv import load_dotenv
 from main import upload_to_google_drive
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (force=True replaces the handler installed when main is imported)
+handler = logging.StreamHandler()
+handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[handler], force=True)
 logger = logging.getLogger(__name__)
 
+# Separator line for the report banner
+_SEP: Final[str] = "=" * 60
+
 
 def test_google_drive_upload():
     """Test Google Drive upload functionality with a sample file."""
     
-    # Load environment variables
-    load_dotenv()
+    # Load environment variables from .env unless they are already exported (e.g. in CI)
+    if not ("GOOGLE_DRIVE_FOLDER_ID" in os.environ and "GOOGLE_SERVICE_ACCOUNT_FILE" in os.environ):
+        load_dotenv(override=False)
     
     # Get configuration
     folder_id = os.getenv("GOOGLE_DRIVE_FOLDER_ID")
@@ -35,8 +44,18 @@ def test_google_drive_upload():
         logger.error("GOOGLE_SERVICE_ACCOUNT_FILE environment variable is not set")
         return False
     
-    if not os.path.exists(service_account_file):
-        logger.error(f"Service account file does not exist: {service_account_file}")
+    try:
+        service_account_stat = os.stat(service_account_file)
+    except OSError as e:
+        logger.error("Service account file is not accessible: %s (%s)", service_account_file, e)
+        return False
+    
+    if not stat.S_ISREG(service_account_stat.st_mode):
+        logger.error("Service account path is not a regular file: %s", service_account_file)
+        return False
+    
+    if service_account_stat.st_size == 0:
+        logger.error("Service account file is empty: %s", service_account_file)
         return False
     
     # Create sample JSON data
@@ -44,20 +63,20 @@ def test_google_drive_upload():
         "title": "Test Article for Google Drive Upload",
         "url": "https://example.com/test-article",
         "starCount": 42,
-        "publishedDate": datetime.now().isoformat() + 'Z'
+        "publishedDate": datetime.now(timezone.utc)
     }
     
-    # Convert to JSON string
-    json_data = json.dumps(sample_article, indent=2, ensure_ascii=False)
+    # Convert to UTF-8 encoded JSON bytes
+    json_data = orjson.dumps(sample_article, option=orjson.OPT_INDENT_2)
     
     # Generate test filename
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    timestamp = time.strftime('%Y%m%d_%H%M%S')
     filename = f"test_upload_{timestamp}.json"
     
     logger.info("Starting Google Drive upload test...")
-    logger.info(f"Folder ID: {folder_id}")
-    logger.info(f"Service Account File: {service_account_file}")
-    logger.info(f"Test Filename: {filename}")
+    logger.info("Folder ID: %s", folder_id)
+    logger.info("Service Account File: %s", service_account_file)
+    logger.info("Test Filename: %s", filename)
     
     # Attempt upload
     file_id = upload_to_google_drive(
@@ -68,8 +87,8 @@ def test_google_drive_upload():
     )
     
     if file_id:
-        logger.info(f"✅ Test successful! File uploaded with ID: {file_id}")
-        logger.info(f"📁 File URL: https://drive.google.com/file/d/{file_id}/view")
+        logger.info("✅ Test successful! File uploaded with ID: %s", file_id)
+        logger.info("📁 File URL: https://drive.google.com/file/d/%s/view", file_id)
         return True
     else:
         logger.error("❌ Test failed! Could not upload file to Google Drive")
@@ -77,15 +96,11 @@ def test_google_drive_upload():
 
 
 if __name__ == "__main__":
-    logger.info("=" * 60)
-    logger.info("GOOGLE DRIVE API CLIENT TEST")
-    logger.info("=" * 60)
+    logger.info("%s\n%s\n%s", _SEP, "GOOGLE DRIVE API CLIENT TEST", _SEP)
     
     success = test_google_drive_upload()
     
-    logger.info("=" * 60)
     if success:
-        logger.info("🎉 All tests passed!")
+        logger.info("%s\n%s\n%s", _SEP, "🎉 All tests passed!", _SEP)
     else:
-        logger.error("💥 Test failed. Please check your configuration.")
-    logger.info("=" * 60)
+        logger.error("%s\n%s\n%s", _SEP, "💥 Test failed. Please check your configuration.", _SEP)